@@ -3,10 +3,50 @@ Create synthetic fake documents for training
 Simulates common forgery techniques
 """
 import cv2
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import random
+from tqdm import tqdm
+
+from src.utils.image_io import read_image
+
+# (dy, dx) offsets covering the largest artifact spot (radius 3)
+_SPOT_OFFSETS = np.mgrid[-3:4, -3:4].reshape(2, -1)
+
+
+def _stamp_artifacts(img, line_ys, spot_xy, spot_r):
+    """
+    Draw scanner lines and filled spots directly into an image array
+    
+    Args:
+        img: Image array, modified in place
+        line_ys: Row index of each scanner line
+        spot_xy: (N, 2) array of spot centres as (x, y)
+        spot_r: (N,) array of spot radii (at most 3)
+    """
+    h, w = img.shape[:2]
+    
+    # Scanner lines span the full width
+    img[line_ys] = 200
+    
+    # Every spot is stamped at once from the shared offset grid
+    dy, dx = _SPOT_OFFSETS
+    inside = dy ** 2 + dx ** 2 <= spot_r[:, None] ** 2
+    ys = spot_xy[:, 1, None] + dy
+    xs = spot_xy[:, 0, None] + dx
+    keep = inside & (ys >= 0) & (ys < h) & (xs >= 0) & (xs < w)
+    img[ys[keep], xs[keep]] = 0
+    
+    return img
+
+
+def _to_bgr(img):
+    """Expand a grayscale array to 3-channel BGR (other arrays are returned as is)"""
+    if img.ndim == 2:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return img
 
 
 class FakeDocumentGenerator:
@@ -21,10 +61,14 @@ class FakeDocumentGenerator:
             'missing_watermark',
             'color_shift'
         ]
+        self.rng = np.random.default_rng()
     
     def remove_hologram(self, image):
         """Simulate hologram removal (white out top-right corner)"""
-        img = image.copy()
+        return self.remove_hologram_inplace(image.copy())
+    
+    def remove_hologram_inplace(self, img):
+        """In-place variant of remove_hologram"""
         h, w = img.shape[:2]
         
         # White out hologram area (top-right)
@@ -37,7 +81,10 @@ class FakeDocumentGenerator:
     
     def alter_text_region(self, image):
         """Alter a text region to simulate tampering"""
-        img = image.copy()
+        return self.alter_text_region_inplace(image.copy())
+    
+    def alter_text_region_inplace(self, img):
+        """In-place variant of alter_text_region"""
         h, w = img.shape[:2]
         
         # Select random region (simulating altered ID number or name)
@@ -58,30 +105,44 @@ class FakeDocumentGenerator:
         return img
     
     def reduce_quality(self, image):
-        """Reduce image quality (common in photocopies)"""
-        img = image.copy()
+        """Reduce image quality (common in photocopies); grayscale input becomes BGR"""
+        if image.ndim == 2:
+            # cvtColor already returns a new array
+            return self.reduce_quality_inplace(_to_bgr(image))
+        return self.reduce_quality_inplace(image.copy())
+    
+    def reduce_quality_inplace(self, img):
+        """In-place variant of reduce_quality (needs a 3-channel BGR array)"""
+        if img.ndim != 3 or img.shape[2] != 3:
+            raise ValueError(
+                f"reduce_quality_inplace needs a 3-channel BGR image, got shape {img.shape}; "
+                "use reduce_quality for grayscale input"
+            )
         
         # Add compression artifacts
         encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), random.randint(20, 50)]
         _, enc_img = cv2.imencode('.jpg', img, encode_param)
-        img = cv2.imdecode(enc_img, 1)
+        np.copyto(img, cv2.imdecode(enc_img, cv2.IMREAD_COLOR))
         
         # Add blur
-        img = cv2.GaussianBlur(img, (5, 5), 0)
+        cv2.GaussianBlur(img, (5, 5), 0, dst=img)
         
-        # Add noise
-        noise = np.random.normal(0, 15, img.shape).astype(np.uint8)
-        img = cv2.add(img, noise)
+        # Add noise (uniform int16 noise with the same spread as sigma=15)
+        noise = self.rng.integers(-26, 27, size=img.shape, dtype=np.int16)
+        noise += img
+        img[...] = np.clip(noise, 0, 255, out=noise)
         
         return img
     
     def shift_colors(self, image):
         """Shift colors (wrong printing or scanning)"""
-        img = image.copy()
-        
+        return self.shift_colors_inplace(image.copy())
+    
+    def shift_colors_inplace(self, img):
+        """In-place variant of shift_colors"""
         # Random color shift
         shift = random.randint(-30, 30)
-        img = cv2.convertScaleAbs(img, alpha=1.0, beta=shift)
+        cv2.convertScaleAbs(img, dst=img, alpha=1.0, beta=shift)
         
         # Alter color balance
         img[:, :, random.randint(0, 2)] = cv2.add(
@@ -93,28 +154,32 @@ class FakeDocumentGenerator:
     
     def add_artifacts(self, image):
         """Add scanning/printing artifacts"""
-        img = image.copy()
+        return self.add_artifacts_inplace(image.copy())
+    
+    def add_artifacts_inplace(self, img):
+        """In-place variant of add_artifacts"""
         h, w = img.shape[:2]
         
-        # Add random lines (scanner artifacts)
-        for _ in range(random.randint(1, 3)):
-            y = random.randint(0, h)
-            cv2.line(img, (0, y), (w, y), (200, 200, 200), 1)
+        # Random lines (scanner artifacts) and spots
+        line_ys = self.rng.integers(0, h, size=random.randint(1, 3))
+        num_spots = random.randint(5, 15)
+        spot_xy = np.column_stack([
+            self.rng.integers(0, max(1, w - 10), size=num_spots),
+            self.rng.integers(0, max(1, h - 10), size=num_spots)
+        ])
+        spot_r = self.rng.integers(1, 4, size=num_spots)
         
-        # Add random spots
-        for _ in range(random.randint(5, 15)):
-            x = random.randint(0, w-10)
-            y = random.randint(0, h-10)
-            cv2.circle(img, (x, y), random.randint(1, 3), (0, 0, 0), -1)
-        
-        return img
+        return _stamp_artifacts(img, line_ys, spot_xy, spot_r)
     
     def create_fake(self, image, method='random'):
         """
         Create a fake document
         
+        The input is copied once and every forgery step then works in place
+        on that copy.
+        
         Args:
-            image: Original image
+            image: Original image (left unchanged)
             method: Forgery method or 'random'
         
         Returns:
@@ -123,25 +188,26 @@ class FakeDocumentGenerator:
         if method == 'random':
             method = random.choice(self.methods)
         
+        img = image.copy()
+        
         if method == 'remove_hologram':
-            return self.remove_hologram(image)
+            return self.remove_hologram_inplace(img)
         elif method == 'alter_text':
-            return self.alter_text_region(image)
+            return self.alter_text_region_inplace(img)
         elif method == 'low_quality':
-            return self.reduce_quality(image)
+            return self.reduce_quality_inplace(_to_bgr(img))
         elif method == 'color_shift':
-            return self.shift_colors(image)
+            return self.shift_colors_inplace(img)
         elif method == 'missing_watermark':
             # Similar to remove_hologram but different region
-            return self.remove_hologram(image)
+            return self.remove_hologram_inplace(img)
         else:
             # Combine multiple methods
-            img = image.copy()
-            img = self.reduce_quality(img)
-            img = self.add_artifacts(img)
+            img = self.reduce_quality_inplace(_to_bgr(img))
+            self.add_artifacts_inplace(img)
             return img
     
-    def generate_fake_dataset(self, input_folder, output_folder, num_fakes_per_image=1):
+    def generate_fake_dataset(self, input_folder, output_folder, num_fakes_per_image=1, verbose=False):
         """
         Generate fake documents from genuine ones
         
@@ -149,6 +215,7 @@ class FakeDocumentGenerator:
             input_folder: Folder with genuine documents
             output_folder: Folder to save fakes
             num_fakes_per_image: Number of fake versions per image
+            verbose: Print a line for every fake created
         """
         input_path = Path(input_folder)
         output_path = Path(output_folder)
@@ -170,21 +237,29 @@ class FakeDocumentGenerator:
         
         total_created = 0
         
-        for img_file in image_files:
-            image = cv2.imread(str(img_file))
-            if image is None:
-                continue
-            
-            for idx in range(num_fakes_per_image):
-                fake_img = self.create_fake(image, method='random')
-                
-                output_filename = f"{img_file.stem}_fake_{idx+1:02d}{img_file.suffix}"
-                output_file = output_path / output_filename
+        # Encode and write on background threads (the encoders release the GIL)
+        # while the main thread generates the next fake
+        with ThreadPoolExecutor(max_workers=2) as writer:
+            for img_file in tqdm(image_files, desc="Generating fakes"):
+                image = read_image(img_file)
+                if image is None:
+                    continue
                 
-                cv2.imwrite(str(output_file), fake_img)
-                total_created += 1
+                pending = []
+                for idx in range(num_fakes_per_image):
+                    fake_img = self.create_fake(image, method='random')
+                    
+                    output_filename = f"{img_file.stem}_fake_{idx+1:02d}{img_file.suffix}"
+                    output_file = output_path / output_filename
+                    
+                    pending.append((output_filename, writer.submit(cv2.imwrite, str(output_file), fake_img)))
                 
-                print(f"✓ Created: {output_filename}")
+                for output_filename, future in pending:
+                    future.result()
+                    total_created += 1
+                    
+                    if verbose:
+                        print(f"✓ Created: {output_filename}")
         
         print(f"\n✅ Fake generation complete!")
         print(f"   Total fake documents created: {total_created}\n")
@@ -199,10 +274,10 @@ if __name__ == "__main__":
     print("=" * 70)
     print("FAKE DOCUMENT GENERATOR")
     print("=" * 70)
-    print("\nUsage:")
-    print("  python scripts/create_fake_documents.py <input_folder> <output_folder> <num_fakes>")
+    print("\nUsage (from the repository root):")
+    print("  python -m scripts.create_fake_documents <input_folder> <output_folder> <num_fakes>")
     print("\nExample:")
-    print("  python scripts/create_fake_documents.py data/raw/national_ids/genuine data/raw/national_ids/fake 1")
+    print("  python -m scripts.create_fake_documents data/raw/national_ids/genuine data/raw/national_ids/fake 1")
     print("\n" + "=" * 70)
     
     if len(sys.argv) >= 3:
@@ -1,19 +1,24 @@
 """
 Calculate and display dataset statistics
 """
+import os
 from pathlib import Path
-import cv2
 import numpy as np
+from PIL import Image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
 
 
 def count_images(folder):
-    """Count images in a folder"""
-    path = Path(folder)
-    if not path.exists():
+    """Count images in a folder (single directory scan)"""
+    try:
+        with os.scandir(folder) as entries:
+            return sum(
+                1 for entry in entries
+                if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+    except FileNotFoundError:
         return 0
-    jpg_count = len(list(path.glob("*.jpg")))
-    png_count = len(list(path.glob("*.png")))
-    return jpg_count + png_count
 
 
 def get_image_stats(folder):
@@ -28,9 +33,12 @@ def get_image_stats(folder):
     
     sizes = []
     for img_path in images[:10]:  # Sample first 10
-        img = cv2.imread(str(img_path))
-        if img is not None:
-            sizes.append(img.shape)
+        # Only the header is parsed; pixel data is never decoded
+        try:
+            with Image.open(img_path) as img:
+                sizes.append((img.height, img.width, len(img.getbands())))
+        except OSError:
+            continue
     
     return {
         'count': len(images),
@@ -2,77 +2,180 @@
 Data augmentation for document images
 Generates multiple variations from original images
 """
+import os
+import random
 import cv2
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 import albumentations as A
+from albumentations.augmentations import functional as F
 from tqdm import tqdm
 
+from src.utils.image_io import read_image
+
+# Per-process augmenter, built once by _init_worker
+_WORKER_AUGMENTER = None
+
+
+def _init_worker(output_size):
+    """Build the augmentation pipelines once per worker process"""
+    global _WORKER_AUGMENTER
+    _WORKER_AUGMENTER = DocumentAugmenter(output_size)
+    
+    # Forked workers inherit the parent's RNG state; reseed from OS entropy
+    # so they do not all produce the same augmentations
+    random.seed()
+    np.random.seed()
+
+
+def _augment_one(task):
+    """Augment a single image file inside a worker process"""
+    img_file, output_path, num_augmentations, light, seed = task
+    if seed is not None:
+        # Albumentations draws from the global RNGs
+        random.seed(seed)
+        np.random.seed(seed)
+    return img_file, _WORKER_AUGMENTER.augment_file(img_file, output_path, num_augmentations, light)
+
+
+class FusedToneLUT(A.ImageOnlyTransform):
+    """
+    Random brightness/contrast and gamma applied as a single 256-entry LUT
+    
+    Equivalent to RandomBrightnessContrast followed by RandomGamma, but walks
+    the pixels once. Each part is sampled with its own probability.
+    
+    Args:
+        brightness_limit: Max brightness shift as a fraction of 255
+        contrast_limit: Max contrast gain deviation from 1.0
+        brightness_contrast_p: Probability of a brightness/contrast change
+        gamma_limit: (low, high) gamma range in percent
+        gamma_p: Probability of a gamma change
+    """
+    
+    def __init__(self, brightness_limit=0.2, contrast_limit=0.2, brightness_contrast_p=0.5,
+                 gamma_limit=(80, 120), gamma_p=0.5, always_apply=False, p=1.0):
+        super().__init__(always_apply, p)
+        self.brightness_limit = brightness_limit
+        self.contrast_limit = contrast_limit
+        self.brightness_contrast_p = brightness_contrast_p
+        self.gamma_limit = gamma_limit
+        self.gamma_p = gamma_p
+    
+    def get_params(self):
+        params = {'alpha': 1.0, 'beta': 0.0, 'gamma': 1.0}
+        if random.random() < self.brightness_contrast_p:
+            params['alpha'] = 1.0 + random.uniform(-self.contrast_limit, self.contrast_limit)
+            params['beta'] = random.uniform(-self.brightness_limit, self.brightness_limit)
+        if random.random() < self.gamma_p:
+            params['gamma'] = random.uniform(*self.gamma_limit) / 100.0
+        return params
+    
+    def apply(self, img, alpha=1.0, beta=0.0, gamma=1.0, **params):
+        if alpha == 1.0 and beta == 0.0 and gamma == 1.0:
+            return img
+        
+        if img.dtype != np.uint8:
+            # cv2.LUT is uint8-only; use the two-step math of the original transforms
+            img = F.brightness_contrast_adjust(img, alpha, beta, beta_by_max=True)
+            return F.gamma_transform(img, gamma)
+        
+        # Brightness/contrast LUT, truncated to uint8 as RandomBrightnessContrast does
+        lut = np.clip(np.arange(256, dtype=np.float32) * alpha + beta * 255, 0, 255).astype(np.uint8)
+        # RandomGamma's table, looked up through the truncated values
+        table = (np.arange(0, 256.0 / 255, 1.0 / 255) ** gamma) * 255
+        return cv2.LUT(img, table.astype(np.uint8)[lut])
+    
+    def get_transform_init_args_names(self):
+        return ('brightness_limit', 'contrast_limit', 'brightness_contrast_p', 'gamma_limit', 'gamma_p')
+
+
+@lru_cache(maxsize=None)
+def _build_pipelines():
+    """
+    Build the (full, light) augmentation pipelines
+    
+    Cached so each process builds them only once. Inputs are expected to be
+    resized to the output size already, so the pipelines contain no resize.
+    
+    Returns:
+        Tuple of (transform, light_transform)
+    """
+    # Define augmentation pipeline
+    transform = A.Compose([
+        # Geometric transformations
+        A.Rotate(limit=5, border_mode=cv2.BORDER_CONSTANT, value=255, p=0.7),
+        A.ShiftScaleRotate(
+            shift_limit=0.05,
+            scale_limit=0.05,
+            rotate_limit=3,
+            border_mode=cv2.BORDER_CONSTANT,
+            value=255,
+            p=0.7
+        ),
+        A.Perspective(scale=(0.02, 0.05), p=0.5),
+    
+        # Image quality variations
+        A.GaussianBlur(blur_limit=(3, 5), p=0.3),
+        A.GaussNoise(var_limit=(5.0, 20.0), p=0.3),
+        A.ISONoise(color_shift=(0.01, 0.05), intensity=(0.1, 0.3), p=0.2),
+    
+        # Brightness, contrast and gamma (fused into one lookup table)
+        FusedToneLUT(
+            brightness_limit=0.15,
+            contrast_limit=0.15,
+            brightness_contrast_p=0.6,
+            gamma_limit=(90, 110),
+            gamma_p=0.3
+        ),
+    
+        # Color variations
+        A.HueSaturationValue(
+            hue_shift_limit=5,
+            sat_shift_limit=10,
+            val_shift_limit=10,
+            p=0.4
+        ),
+    
+        # Compression artifacts
+        A.ImageCompression(quality_lower=85, quality_upper=100, p=0.3)
+    ])
+    
+    # Lighter augmentation (for validation set)
+    light_transform = A.Compose([
+        A.Rotate(limit=2, border_mode=cv2.BORDER_CONSTANT, value=255, p=0.5),
+        FusedToneLUT(
+            brightness_limit=0.1,
+            contrast_limit=0.1,
+            brightness_contrast_p=0.4,
+            gamma_p=0.0
+        )
+    ])
+    
+    return transform, light_transform
+
 
 class DocumentAugmenter:
     """Augment document images for training"""
     
     def __init__(self, output_size=(224, 224)):
         """
-        Initialize augmenter with transformation pipeline
+        Initialize augmenter with cached transformation pipelines
         
         Args:
-            output_size: Target size for augmented images
+            output_size: Target (width, height) for augmented images
         """
-        self.output_size = output_size
-        
-        # Define augmentation pipeline
-        self.transform = A.Compose([
-            # Geometric transformations
-            A.Rotate(limit=5, border_mode=cv2.BORDER_CONSTANT, value=255, p=0.7),
-            A.ShiftScaleRotate(
-                shift_limit=0.05,
-                scale_limit=0.05,
-                rotate_limit=3,
-                border_mode=cv2.BORDER_CONSTANT,
-                value=255,
-                p=0.7
-            ),
-            A.Perspective(scale=(0.02, 0.05), p=0.5),
-            
-            # Image quality variations
-            A.GaussianBlur(blur_limit=(3, 5), p=0.3),
-            A.GaussNoise(var_limit=(5.0, 20.0), p=0.3),
-            A.ISONoise(color_shift=(0.01, 0.05), intensity=(0.1, 0.3), p=0.2),
-            
-            # Brightness and contrast
-            A.RandomBrightnessContrast(
-                brightness_limit=0.15,
-                contrast_limit=0.15,
-                p=0.6
-            ),
-            A.RandomGamma(gamma_limit=(90, 110), p=0.3),
-            
-            # Color variations
-            A.HueSaturationValue(
-                hue_shift_limit=5,
-                sat_shift_limit=10,
-                val_shift_limit=10,
-                p=0.4
-            ),
-            
-            # Compression artifacts
-            A.ImageCompression(quality_lower=85, quality_upper=100, p=0.3),
-            
-            # Resize to target
-            A.Resize(height=output_size[0], width=output_size[1])
-        ])
-        
-        # Lighter augmentation (for validation set)
-        self.light_transform = A.Compose([
-            A.Rotate(limit=2, border_mode=cv2.BORDER_CONSTANT, value=255, p=0.5),
-            A.RandomBrightnessContrast(
-                brightness_limit=0.1,
-                contrast_limit=0.1,
-                p=0.4
-            ),
-            A.Resize(height=output_size[0], width=output_size[1])
-        ])
+        self.output_size = tuple(output_size)
+        self.transform, self.light_transform = _build_pipelines()
+    
+    def _resize_to_output(self, image):
+        """Resize to output_size, returning images already that size unchanged"""
+        width, height = self.output_size
+        if image.shape[:2] == (height, width):
+            return image
+        return cv2.resize(image, self.output_size, interpolation=cv2.INTER_AREA)
     
     def augment_image(self, image, num_augmentations=10, light=False):
         """
@@ -86,24 +189,106 @@ class DocumentAugmenter:
         Returns:
             List of augmented images
         """
-        augmented_images = []
+        return list(self.iter_augmentations(image, num_augmentations, light))
+    
+    def iter_augmentations(self, image, num_augmentations=10, light=False):
+        """
+        Lazily generate augmented versions of an image, one at a time
+        
+        Args:
+            image: Input image (numpy array)
+            num_augmentations: Number of variations to create
+            light: Use lighter augmentations
+        
+        Yields:
+            Augmented images
+        """
         transform = self.light_transform if light else self.transform
         
+        # Resize once up front so every augmentation works on output-size pixels
+        image = np.ascontiguousarray(self._resize_to_output(image))
+        
         for _ in range(num_augmentations):
-            augmented = transform(image=image)
-            augmented_images.append(augmented['image'])
+            yield transform(image=image)['image']
+    
+    def augment_file(self, img_file, output_path, num_augmentations=10, light=False):
+        """
+        Save the resized original and its augmentations for one image file
+        
+        Args:
+            img_file: Path to the source image
+            output_path: Folder to save images into
+            num_augmentations: Number of variations to create
+            light: Use lighter augmentations
+        
+        Returns:
+            Number of images written, or None if the image could not be loaded
+        """
+        # Decode at no less than 4x the output size; everything is resized down anyway
+        decode_side = 4 * max(self.output_size)
+        image = read_image(img_file, min_size=(decode_side, decode_side))
+        if image is None:
+            return None
+        
+        # Resize once; the saved original and every augmentation share it
+        image = self._resize_to_output(image)
+        
+        # Writes run on background threads (the encoders release the GIL)
+        # while this thread produces the next augmentation
+        with ThreadPoolExecutor(max_workers=2) as writer:
+            # Save original (resized)
+            original_output = output_path / f"{img_file.stem}_original{img_file.suffix}"
+            pending = [writer.submit(cv2.imwrite, str(original_output), image)]
+            
+            # Generate and save augmentations
+            augmented_images = self.iter_augmentations(image, num_augmentations, light)
+            for idx, aug_img in enumerate(augmented_images, 1):
+                output_file = output_path / f"{img_file.stem}_aug_{idx:02d}{img_file.suffix}"
+                pending.append(writer.submit(cv2.imwrite, str(output_file), aug_img))
+            
+            for future in pending:
+                future.result()
         
-        return augmented_images
+        return len(pending)
     
-    def augment_dataset(self, input_folder, output_folder, num_augmentations=10, light=False):
+    def _augment_files(self, image_files, output_path, num_augmentations, light, desc,
+                       max_workers=None, seed=None):
+        """Augment image files in parallel worker processes, returning the number written"""
+        # Seeding per task keeps results reproducible regardless of scheduling
+        tasks = [
+            (img_file, output_path, num_augmentations, light, None if seed is None else seed + idx)
+            for idx, img_file in enumerate(image_files)
+        ]
+        total_created = 0
+        
+        with ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(self.output_size,)
+        ) as executor:
+            results = executor.map(_augment_one, tasks, chunksize=4)
+            for img_file, created in tqdm(results, total=len(tasks), desc=desc):
+                if created is None:
+                    print(f"⚠️  Could not load: {img_file.name}")
+                    continue
+                total_created += created
+        
+        return total_created
+    
+    def augment_dataset(self, input_folder, output_folder, num_augmentations=10, light=False,
+                        max_workers=None, seed=None):
         """
         Augment all images in a folder
         
+        Images are independent, so they are spread across worker processes.
+        
         Args:
             input_folder: Folder containing original images
             output_folder: Folder to save augmented images
             num_augmentations: Number of variations per image
             light: Use lighter augmentations
+            max_workers: Number of worker processes (defaults to CPU count)
+            seed: Optional base seed for reproducible augmentations
         """
         input_path = Path(input_folder)
         output_path = Path(output_folder)
@@ -127,31 +312,10 @@ class DocumentAugmenter:
         print(f"Expected output: {len(image_files) * (num_augmentations + 1)} images")
         print(f"{'='*60}\n")
         
-        total_created = 0
-        
-        # Process each image
-        for img_file in tqdm(image_files, desc="Augmenting images"):
-            # Load image
-            image = cv2.imread(str(img_file))
-            if image is None:
-                print(f"⚠️  Could not load: {img_file.name}")
-                continue
-            
-            # Save original (resized)
-            original_resized = cv2.resize(image, self.output_size)
-            original_output = output_path / f"{img_file.stem}_original{img_file.suffix}"
-            cv2.imwrite(str(original_output), original_resized)
-            total_created += 1
-            
-            # Generate augmentations
-            augmented_images = self.augment_image(image, num_augmentations, light)
-            
-            # Save augmented images
-            for idx, aug_img in enumerate(augmented_images, 1):
-                output_filename = f"{img_file.stem}_aug_{idx:02d}{img_file.suffix}"
-                output_file = output_path / output_filename
-                cv2.imwrite(str(output_file), aug_img)
-                total_created += 1
+        total_created = self._augment_files(
+            image_files, output_path, num_augmentations, light,
+            desc="Augmenting images", max_workers=max_workers, seed=seed
+        )
         
         print(f"\n✅ Augmentation complete!")
         print(f"   Original images: {len(image_files)}")
@@ -193,39 +357,13 @@ class DocumentAugmenter:
         train_folder = Path(output_base) / "train"
         train_folder.mkdir(parents=True, exist_ok=True)
         
-        for img_file in tqdm(train_files, desc="Creating training set"):
-            image = cv2.imread(str(img_file))
-            if image is None:
-                continue
-            
-            # Original
-            original_resized = cv2.resize(image, self.output_size)
-            cv2.imwrite(str(train_folder / f"{img_file.stem}_original{img_file.suffix}"), original_resized)
-            
-            # Augmentations
-            augmented = self.augment_image(image, train_aug, light=False)
-            for idx, aug_img in enumerate(augmented, 1):
-                output_file = train_folder / f"{img_file.stem}_aug_{idx:02d}{img_file.suffix}"
-                cv2.imwrite(str(output_file), aug_img)
+        self._augment_files(train_files, train_folder, train_aug, False, desc="Creating training set")
         
         # Create validation set (lighter augmentation)
         val_folder = Path(output_base) / "validation"
         val_folder.mkdir(parents=True, exist_ok=True)
         
-        for img_file in tqdm(val_files, desc="Creating validation set"):
-            image = cv2.imread(str(img_file))
-            if image is None:
-                continue
-            
-            # Original
-            original_resized = cv2.resize(image, self.output_size)
-            cv2.imwrite(str(val_folder / f"{img_file.stem}_original{img_file.suffix}"), original_resized)
-            
-            # Light augmentations
-            augmented = self.augment_image(image, val_aug, light=True)
-            for idx, aug_img in enumerate(augmented, 1):
-                output_file = val_folder / f"{img_file.stem}_aug_{idx:02d}{img_file.suffix}"
-                cv2.imwrite(str(output_file), aug_img)
+        self._augment_files(val_files, val_folder, val_aug, True, desc="Creating validation set")
         
         train_count = len(list(train_folder.glob("*.jpg"))) + len(list(train_folder.glob("*.png")))
         val_count = len(list(val_folder.glob("*.jpg"))) + len(list(val_folder.glob("*.png")))
@@ -245,10 +383,10 @@ if __name__ == "__main__":
     print("=" * 70)
     print("DOCUMENT AUGMENTATION TOOL")
     print("=" * 70)
-    print("\nUsage:")
-    print("  python src/preprocessing/augmentation.py <input_folder> <output_folder> <num_aug>")
+    print("\nUsage (from the repository root):")
+    print("  python -m src.preprocessing.augmentation <input_folder> <output_folder> <num_aug>")
     print("\nExample:")
-    print("  python src/preprocessing/augmentation.py data/raw/national_ids/genuine data/augmented/national_ids 10")
+    print("  python -m src.preprocessing.augmentation data/raw/national_ids/genuine data/augmented/national_ids 10")
     print("\n" + "=" * 70)
     
     # If arguments provided, run augmentation
@@ -1,37 +1,101 @@
 """
 Image preprocessing for document verification
 """
+import logging
+import os
+import queue
+import threading
 import cv2
 import numpy as np
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from PIL import Image
+
+from src.utils.image_io import read_image
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 
 class ImageProcessor:
     """Preprocess document images for ML model"""
     
-    def __init__(self, target_size=(224, 224)):
+    def __init__(self, target_size=(224, 224), resize_first=True, device='cpu',
+                 resize_backend='cv2'):
         """
         Initialize processor
         
         Args:
             target_size: (width, height) for resized images
+            resize_first: Resize before denoising/enhancing (fast path). Set to
+                False to run the original full-resolution pipeline for debugging
+            device: 'cpu', or 'cuda' to run resize/denoise/contrast on the GPU
+                (requires an OpenCV build with CUDA support)
+            resize_backend: 'cv2', or 'pil' to resize with Pillow (fast with
+                Pillow-SIMD). Interpolation differs slightly between the two,
+                so use the same backend for training and inference
         """
+        if device not in ('cpu', 'cuda'):
+            raise ValueError(f"Unsupported device: {device}")
+        if resize_backend not in ('cv2', 'pil'):
+            raise ValueError(f"Unsupported resize backend: {resize_backend}")
+        if device == 'cuda' and cv2.cuda.getCudaEnabledDeviceCount() == 0:
+            raise ValueError("CUDA requested but no CUDA-enabled OpenCV device is available")
+        
         self.target_size = target_size
+        self.resize_first = resize_first
+        self.device = device
+        self.resize_backend = resize_backend
+        self._init_runtime_state()
+    
+    def _init_runtime_state(self):
+        """Create the unpicklable per-thread and GPU state"""
+        # CLAHE objects and scratch buffers are reused, one per thread since
+        # they are not thread-safe
+        self._local = threading.local()
+        
+        if self.device == 'cuda':
+            self._cuda_clahe = cv2.cuda.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
     
-    def load_image(self, image_path):
-        """Load image from file"""
-        img = cv2.imread(str(image_path))
+    def __getstate__(self):
+        """Pickle only the settings, so processors can be sent to worker processes"""
+        state = self.__dict__.copy()
+        state.pop('_local', None)
+        state.pop('_cuda_clahe', None)
+        return state
+    
+    def __setstate__(self, state):
+        """Restore settings and rebuild the per-thread and GPU state"""
+        self.__dict__.update(state)
+        self._init_runtime_state()
+    
+    def load_image(self, image_path, reduce=False):
+        """
+        Load image from file
+        
+        Args:
+            image_path: Path to image file
+            reduce: For JPEGs, let libjpeg decode at 1/2, 1/4 or 1/8 scale
+                as long as the result is still at least target_size
+        """
+        if reduce:
+            img = read_image(image_path, min_size=self.target_size)
+        else:
+            img = cv2.imread(str(image_path))
         if img is None:
             raise ValueError(f"Could not load image: {image_path}")
         return img
     
     def resize(self, image):
-        """Resize image to target size"""
+        """Resize image to target size with the configured backend"""
+        if self.resize_backend == 'pil':
+            return np.array(Image.fromarray(image).resize(self.target_size, Image.BILINEAR))
         return cv2.resize(image, self.target_size)
     
     def normalize(self, image):
-        """Normalize pixel values to [0, 1]"""
-        return image.astype(np.float32) / 255.0
+        """Normalize pixel values to [0, 1] (cast and scale in a single pass)"""
+        return np.multiply(image, np.float32(1.0 / 255.0), dtype=np.float32)
     
     def to_grayscale(self, image):
         """Convert to grayscale"""
@@ -40,32 +104,46 @@ class ImageProcessor:
         return image
     
     def denoise(self, image):
-        """Remove noise from image"""
+        """Remove noise from image (edge-preserving bilateral filter)"""
         if len(image.shape) == 3:
-            return cv2.fastNlMeansDenoisingColored(image, None, 10, 10, 7, 21)
+            return cv2.bilateralFilter(image, d=5, sigmaColor=40, sigmaSpace=40)
         else:
-            return cv2.fastNlMeansDenoising(image, None, 10, 7, 21)
+            return cv2.GaussianBlur(image, (3, 3), 0)
+    
+    def _get_clahe(self):
+        """Return this thread's CLAHE object, creating it on first use"""
+        clahe = getattr(self._local, 'clahe', None)
+        if clahe is None:
+            clahe = self._local.clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+        return clahe
     
     def enhance_contrast(self, image):
         """Enhance image contrast using CLAHE"""
+        clahe = self._get_clahe()
+        
         if len(image.shape) == 2:
             # Grayscale image
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
             return clahe.apply(image)
         else:
-            # Color image - apply to LAB color space
+            # Color image - apply to the L channel of LAB in place (no split/merge)
             lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-            l = clahe.apply(l)
-            
-            enhanced = cv2.merge([l, a, b])
-            return cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
+            lab[:, :, 0] = clahe.apply(lab[:, :, 0])
+            return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, dst=lab)
+    
+    def _get_gray_buffer(self, shape):
+        """Return this thread's grayscale scratch buffer for the given (h, w)"""
+        gray = getattr(self._local, 'gray', None)
+        if gray is None or gray.shape != shape:
+            gray = self._local.gray = np.empty(shape, dtype=np.uint8)
+        return gray
     
     def detect_edges(self, image):
         """Detect edges using Canny"""
-        gray = self.to_grayscale(image)
+        if len(image.shape) == 3:
+            gray = self._get_gray_buffer(image.shape[:2])
+            cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=gray)
+        else:
+            gray = image
         edges = cv2.Canny(gray, 50, 150)
         return edges
     
@@ -81,8 +159,19 @@ class ImageProcessor:
         Returns:
             Preprocessed image (normalized, resized)
         """
-        # Load image
-        img = self.load_image(image_path)
+        return self.normalize(self._prepare(image_path, denoise, enhance))
+    
+    def _prepare(self, image_path, denoise=True, enhance=True):
+        """Run the preprocessing pipeline up to (not including) normalization"""
+        if self.device == 'cuda':
+            return self._prepare_cuda(image_path, denoise, enhance)
+        
+        # Load image (at reduced JPEG scale on the fast path)
+        img = self.load_image(image_path, reduce=self.resize_first)
+        
+        # Resize first so the filters below only touch target_size pixels
+        if self.resize_first:
+            img = self.resize(img)
         
         # Optional: Denoise
         if denoise:
@@ -93,64 +182,213 @@ class ImageProcessor:
             img = self.enhance_contrast(img)
         
         # Resize
-        img = self.resize(img)
-        
-        # Normalize
-        img = self.normalize(img)
+        if not self.resize_first:
+            img = self.resize(img)
         
         return img
     
-    def preprocess_batch(self, image_folder, output_folder=None):
+    def _prepare_cuda(self, image_path, denoise=True, enhance=True):
+        """GPU variant of _prepare using OpenCV's CUDA modules"""
+        # Decode on the CPU, then keep every step on the device
+        gpu_img = cv2.cuda_GpuMat()
+        gpu_img.upload(self.load_image(image_path, reduce=self.resize_first))
+        
+        if self.resize_first:
+            gpu_img = cv2.cuda.resize(gpu_img, self.target_size)
+        
+        if denoise:
+            gpu_img = cv2.cuda.bilateralFilter(gpu_img, 5, 40, 40)
+        
+        if enhance:
+            lab = cv2.cuda.cvtColor(gpu_img, cv2.COLOR_BGR2LAB)
+            l, a, b = cv2.cuda.split(lab)
+            l = self._cuda_clahe.apply(l, cv2.cuda_Stream.Null())
+            gpu_img = cv2.cuda.cvtColor(cv2.cuda.merge([l, a, b]), cv2.COLOR_LAB2BGR)
+        
+        if not self.resize_first:
+            gpu_img = cv2.cuda.resize(gpu_img, self.target_size)
+        
+        return gpu_img.download()
+    
+    def _try_prepare(self, image_path, encode_ext=None):
+        """
+        Run _prepare without raising
+        
+        Args:
+            image_path: Path to image file
+            encode_ext: Optional extension (e.g. '.jpg') to also encode the
+                result to, so encoding happens on the worker thread
+        
+        Returns:
+            Tuple of (image, encoded bytes or None, error or None)
+        """
+        try:
+            img = self._prepare(image_path)
+            encoded = None
+            if encode_ext:
+                ok, buf = cv2.imencode(encode_ext, img)
+                if not ok:
+                    raise ValueError(f"Could not encode image as {encode_ext}")
+                encoded = buf.tobytes()
+            return img, encoded, None
+        except Exception as e:
+            return None, None, e
+    
+    @staticmethod
+    def _drain_writes(write_queue, write_errors):
+        """Write (path, bytes) items from a queue until a None sentinel arrives"""
+        while True:
+            item = write_queue.get()
+            if item is None:
+                return
+            path, data = item
+            try:
+                path.write_bytes(data)
+            except OSError as e:
+                write_errors.append((path, e))
+    
+    def preprocess_batch(self, image_folder, output_folder=None, max_workers=None):
         """
         Preprocess all images in a folder
         
+        Images are prepared (and encoded, when saving) on a thread pool since
+        OpenCV releases the GIL, then collected as uint8 into one preallocated
+        buffer and normalized together in a single pass. Encoded outputs are
+        written to disk by a separate writer thread.
+        
         Args:
             image_folder: Folder containing images
             output_folder: Optional folder to save preprocessed images
+            max_workers: Number of worker threads (defaults to CPU count)
         
         Returns:
-            List of preprocessed images
+            Array of preprocessed images with shape (N, height, width, 3)
         """
-        input_path = Path(image_folder)
-        image_files = list(input_path.glob("*.jpg")) + list(input_path.glob("*.png"))
+        # One directory scan covers every extension; a missing folder is an empty batch
+        try:
+            with os.scandir(image_folder) as entries:
+                image_files = sorted(
+                    Path(entry.path) for entry in entries
+                    if entry.is_file() and entry.name.lower().endswith((".jpg", ".jpeg", ".png"))
+                )
+        except FileNotFoundError:
+            image_files = []
         
-        preprocessed = []
+        width, height = self.target_size
+        batch = np.empty((len(image_files), height, width, 3), dtype=np.uint8)
+        count = 0
         
-        print(f"\nPreprocessing {len(image_files)} images...")
+        write_queue = None
+        write_errors = []
+        if output_folder:
+            output_path = Path(output_folder)
+            output_path.mkdir(parents=True, exist_ok=True)
+            
+            write_queue = queue.Queue()
+            writer = threading.Thread(target=self._drain_writes, args=(write_queue, write_errors), daemon=True)
+            writer.start()
         
-        for img_file in image_files:
-            try:
-                img = self.preprocess(str(img_file))
-                preprocessed.append(img)
-                print(f"✓ {img_file.name}")
+        logger.info("Preprocessing %d images...", len(image_files))
+        counts = Counter()
+        
+        # The CUDA path shares one CLAHE object and the default stream
+        if self.device == 'cuda':
+            max_workers = 1
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+                encode_exts = [img_file.suffix if output_folder else None for img_file in image_files]
+                results = executor.map(self._try_prepare, map(str, image_files), encode_exts)
                 
-                # Save if output folder specified
-                if output_folder:
-                    output_path = Path(output_folder)
-                    output_path.mkdir(parents=True, exist_ok=True)
-                    output_file = output_path / img_file.name
+                for img_file, (img, encoded, error) in zip(image_files, results):
+                    if error is not None:
+                        logger.warning("Error processing %s: %s", img_file.name, error)
+                        counts['failed'] += 1
+                        continue
                     
-                    # Convert back to uint8 for saving
-                    save_img = (img * 255).astype(np.uint8)
-                    cv2.imwrite(str(output_file), save_img)
+                    batch[count] = img
+                    counts['ok'] += 1
                     
-            except Exception as e:
-                print(f"✗ Error processing {img_file.name}: {e}")
+                    # Save if output folder specified
+                    if encoded is not None:
+                        write_queue.put((output_path / img_file.name, encoded))
+                    
+                    count += 1
+        finally:
+            if write_queue is not None:
+                write_queue.put(None)
+                writer.join()
+        
+        for path, e in write_errors:
+            logger.warning("Error saving %s: %s", path.name, e)
+        counts['save_failed'] = len(write_errors)
         
-        print(f"\n✓ Preprocessed {len(preprocessed)} images")
+        preprocessed = self.normalize(batch[:count])
+        
+        logger.info(
+            "Preprocessed %d images (%d failed, %d not saved)",
+            counts['ok'], counts['failed'], counts['save_failed']
+        )
         return preprocessed
     
+    def preprocess_many(self, image_paths, out_layout='NCHW', max_workers=None):
+        """
+        Preprocess a list of images straight into one model-ready tensor
+        
+        Scaling to [0, 1], the float32 cast and the HWC -> CHW transpose are
+        done together in one ufunc pass per image, writing directly into the
+        output tensor.
+        
+        Args:
+            image_paths: Paths to image files
+            out_layout: 'NCHW' (default) or 'NHWC'
+            max_workers: Number of worker threads (defaults to CPU count)
+        
+        Returns:
+            float32 array of shape (N, 3, height, width) or (N, height, width, 3)
+        
+        Raises:
+            ValueError: If the layout is unsupported or an image cannot be loaded
+        """
+        if out_layout not in ('NCHW', 'NHWC'):
+            raise ValueError(f"Unsupported layout: {out_layout}")
+        
+        image_paths = [str(path) for path in image_paths]
+        width, height = self.target_size
+        if out_layout == 'NCHW':
+            out = np.empty((len(image_paths), 3, height, width), dtype=np.float32)
+        else:
+            out = np.empty((len(image_paths), height, width, 3), dtype=np.float32)
+        scale = np.float32(1.0 / 255.0)
+        
+        # The CUDA path shares one CLAHE object and the default stream
+        if self.device == 'cuda':
+            max_workers = 1
+        
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            for idx, img in enumerate(executor.map(self._prepare, image_paths)):
+                if out_layout == 'NCHW':
+                    img = img.transpose(2, 0, 1)
+                np.multiply(img, scale, out=out[idx])
+        
+        return out
+    
     def get_image_stats(self, image_path):
         """Get basic statistics about an image"""
         img = self.load_image(image_path)
         
+        # View all channels as one column so each OpenCV call is a single pass
+        flat = img.reshape(-1, 1)
+        mean, std = cv2.meanStdDev(flat)
+        min_pixel, max_pixel, _, _ = cv2.minMaxLoc(flat)
+        
         stats = {
             'shape': img.shape,
             'size_mb': Path(image_path).stat().st_size / (1024 * 1024),
-            'mean_pixel': np.mean(img),
-            'std_pixel': np.std(img),
-            'min_pixel': np.min(img),
-            'max_pixel': np.max(img),
+            'mean_pixel': float(mean[0, 0]),
+            'std_pixel': float(std[0, 0]),
+            'min_pixel': img.dtype.type(min_pixel),
+            'max_pixel': img.dtype.type(max_pixel),
             'dtype': img.dtype
         }
         
@@ -0,0 +1,104 @@
+"""
+Shared image loading helpers
+Fast JPEG decoding that keeps EXIF orientation consistent with cv2.imread
+"""
+import io
+from pathlib import Path
+
+import cv2
+from PIL import Image
+
+# libjpeg-turbo is optional; fall back to OpenCV's decoder when unavailable
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _TURBO_JPEG = TurboJPEG()
+except (ImportError, RuntimeError, OSError):
+    _TURBO_JPEG = None
+
+JPEG_SUFFIXES = ('.jpg', '.jpeg')
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+
+def _read_header(source):
+    """Return ((width, height), EXIF orientation) of a path or file without decoding pixels"""
+    try:
+        with Image.open(source) as img:
+            return img.size, img.getexif().get(EXIF_ORIENTATION_TAG, 1)
+    except OSError:
+        return None, 1
+
+
+def apply_exif_orientation(image, orientation):
+    """
+    Rotate/flip a decoded image the way cv2.imread does for an EXIF orientation
+
+    Args:
+        image: Decoded image array (as stored in the file)
+        orientation: EXIF orientation value (1-8)
+    """
+    if orientation == 2:
+        return cv2.flip(image, 1)
+    if orientation == 3:
+        return cv2.rotate(image, cv2.ROTATE_180)
+    if orientation == 4:
+        return cv2.flip(image, 0)
+    if orientation == 5:
+        return cv2.transpose(image)
+    if orientation == 6:
+        return cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 7:
+        return cv2.rotate(cv2.transpose(image), cv2.ROTATE_180)
+    if orientation == 8:
+        return cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return image
+
+
+def _reduced_read_flag(size, min_size):
+    """Pick the largest DCT-domain JPEG downscale that stays at least min_size"""
+    if size is None:
+        return cv2.IMREAD_COLOR
+
+    # Orientation may swap the sides, so compare the short side to the larger target
+    scale = min(size) // max(min_size)
+    if scale >= 8:
+        return cv2.IMREAD_REDUCED_COLOR_8
+    if scale >= 4:
+        return cv2.IMREAD_REDUCED_COLOR_4
+    if scale >= 2:
+        return cv2.IMREAD_REDUCED_COLOR_2
+    return cv2.IMREAD_COLOR
+
+
+def read_image(path, min_size=None):
+    """
+    Load an image as BGR with the same orientation cv2.imread would give
+
+    Args:
+        path: Image file path
+        min_size: Optional (width, height); JPEGs are DCT-scaled while decoding
+            to the smallest 1/2, 1/4 or 1/8 size still at least this large
+
+    Returns:
+        BGR image array, or None if the file could not be decoded
+    """
+    path = Path(path)
+    if path.suffix.lower() not in JPEG_SUFFIXES:
+        return cv2.imread(str(path))
+
+    if min_size is not None:
+        # OpenCV's reduced reads keep its EXIF orientation handling
+        size, _ = _read_header(path)
+        return cv2.imread(str(path), _reduced_read_flag(size, min_size))
+
+    if _TURBO_JPEG is not None:
+        try:
+            data = path.read_bytes()
+            image = _TURBO_JPEG.decode(data, pixel_format=TJPF_BGR)
+        except OSError:
+            return None
+        # Parse the orientation from the bytes already in memory
+        _, orientation = _read_header(io.BytesIO(data))
+        return apply_exif_orientation(image, orientation)
+
+    return cv2.imread(str(path))
@@ -2,8 +2,34 @@
 Document template loader and manager
 Loads JSON templates for each document type
 """
+import copy
 import json
+import logging
+import os
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
+
+# orjson is optional and parses several times faster than the stdlib
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+_EMPTY = MappingProxyType({})
+
+
+def _freeze(value):
+    """Recursively wrap dicts in read-only views and turn lists into tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
 
 
 class TemplateLoader:
@@ -12,45 +38,77 @@ class TemplateLoader:
     def __init__(self, template_dir: str = "data/templates"):
         self.template_dir = Path(template_dir)
         self.templates = {}
+        self._views = {}
         self._load_all_templates()
+        self._build_views()
 
     def _load_all_templates(self):
         """Load all JSON templates from template directory"""
         if not self.template_dir.exists():
-            print(f"Warning: Template directory not found: {self.template_dir}")
+            logger.warning("Template directory not found: %s", self.template_dir)
             return
 
-        for template_file in self.template_dir.glob("*.json"):
+        with os.scandir(self.template_dir) as entries:
+            template_files = [
+                Path(entry.path) for entry in entries
+                if entry.is_file() and entry.name.endswith(".json")
+            ]
+
+        for template_file in template_files:
             try:
-                with open(template_file, "r") as f:
-                    template = json.load(f)
+                template = _json_loads(template_file.read_bytes())
                 doc_type = template.get("document_type", template_file.stem)
                 self.templates[doc_type] = template
-                print(f"  Loaded template: {doc_type}")
+                logger.debug("Loaded template: %s", doc_type)
             except Exception as e:
-                print(f"  Error loading {template_file.name}: {e}")
+                logger.error("Error loading %s: %s", template_file.name, e)
+
+    def _build_views(self):
+        """Precompute deeply read-only views of each template's sections"""
+        self._views = {}
+        for doc_type, template in self.templates.items():
+            frozen = _freeze(template)
+            self._views[doc_type] = {
+                "security_features": frozen.get("security_features", _EMPTY),
+                "data_fields": frozen.get("data_fields", _EMPTY),
+                "forgery_indicators": frozen.get("forgery_indicators", ()),
+                "validation_rules": frozen.get("validation_rules", _EMPTY),
+            }
+
+    def _get_views(self, doc_type: str) -> dict:
+        """Get the precomputed views for a document type"""
+        if doc_type not in self._views:
+            raise ValueError(f"No template found for: {doc_type}")
+        return self._views[doc_type]
 
     def get_template(self, doc_type: str) -> dict:
-        """Get template for a document type"""
+        """
+        Get template for a document type
+
+        Returns a deep copy made of plain dicts and lists, so it can be
+        serialized (e.g. json.dumps) and edited without affecting the loader.
+        The section getters below return nested read-only views instead,
+        which are not JSON serializable.
+        """
         if doc_type not in self.templates:
             raise ValueError(f"No template found for: {doc_type}")
-        return self.templates[doc_type]
+        return copy.deepcopy(self.templates[doc_type])
 
-    def get_security_features(self, doc_type: str) -> dict:
-        """Get security features for a document type"""
-        return self.get_template(doc_type).get("security_features", {})
+    def get_security_features(self, doc_type: str) -> Mapping:
+        """Get security features for a document type (read-only view)"""
+        return self._get_views(doc_type)["security_features"]
 
-    def get_data_fields(self, doc_type: str) -> dict:
-        """Get data fields for a document type"""
-        return self.get_template(doc_type).get("data_fields", {})
+    def get_data_fields(self, doc_type: str) -> Mapping:
+        """Get data fields for a document type (read-only view)"""
+        return self._get_views(doc_type)["data_fields"]
 
-    def get_forgery_indicators(self, doc_type: str) -> list:
+    def get_forgery_indicators(self, doc_type: str) -> tuple:
         """Get forgery indicators for a document type"""
-        return self.get_template(doc_type).get("forgery_indicators", [])
+        return self._get_views(doc_type)["forgery_indicators"]
 
-    def get_validation_rules(self, doc_type: str) -> dict:
-        """Get validation rules for a document type"""
-        return self.get_template(doc_type).get("validation_rules", {})
+    def get_validation_rules(self, doc_type: str) -> Mapping:
+        """Get validation rules for a document type (read-only view)"""
+        return self._get_views(doc_type)["validation_rules"]
 
     def list_supported_documents(self) -> list:
         """List all supported document types"""
@@ -59,6 +117,8 @@ class TemplateLoader:
 
 # Test the loader
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="  %(message)s")
+
     print("=" * 50)
     print("TEMPLATE LOADER TEST")
     print("=" * 50)
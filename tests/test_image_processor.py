@@ -0,0 +1,64 @@
+"""
+Unit tests for image processor
+"""
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.preprocessing.image_processor import ImageProcessor
+
+
+@pytest.fixture(scope="module")
+def image_paths(tmp_path_factory):
+    """A few synthetic document images of different sizes"""
+    folder = tmp_path_factory.mktemp("images")
+    rng = np.random.default_rng(0)
+    paths = []
+    for idx, (height, width) in enumerate([(300, 400), (240, 320), (500, 350)]):
+        path = folder / f"doc{idx}.png"
+        cv2.imwrite(str(path), rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture(scope="module")
+def processor():
+    """Shared ImageProcessor with a non-square target size"""
+    return ImageProcessor(target_size=(64, 48))
+
+
+def test_preprocess_many_nchw(processor, image_paths):
+    """Test NCHW batch matches preprocess() transposed to CHW"""
+    batch = processor.preprocess_many(image_paths)
+    assert batch.shape == (len(image_paths), 3, 48, 64)
+    assert batch.dtype == np.float32
+    for idx, path in enumerate(image_paths):
+        expected = processor.preprocess(str(path)).transpose(2, 0, 1)
+        np.testing.assert_array_equal(batch[idx], expected)
+
+
+def test_preprocess_many_nhwc(processor, image_paths):
+    """Test NHWC batch matches preprocess() directly"""
+    batch = processor.preprocess_many(image_paths, out_layout='NHWC')
+    assert batch.shape == (len(image_paths), 48, 64, 3)
+    for idx, path in enumerate(image_paths):
+        np.testing.assert_array_equal(batch[idx], processor.preprocess(str(path)))
+
+
+def test_preprocess_many_unreadable_path(processor, image_paths, tmp_path):
+    """Test that an unreadable image raises ValueError"""
+    with pytest.raises(ValueError):
+        processor.preprocess_many([image_paths[0], tmp_path / "missing.jpg"])
+
+
+def test_preprocess_many_invalid_layout(processor, image_paths):
+    """Test error handling for an unsupported layout"""
+    with pytest.raises(ValueError):
+        processor.preprocess_many(image_paths, out_layout='CHW')
+
+
+def test_preprocess_batch_missing_folder(processor, tmp_path):
+    """Test that a missing folder gives an empty batch, as Path.glob did"""
+    batch = processor.preprocess_batch(tmp_path / "missing")
+    assert batch.shape == (0, 48, 64, 3)
@@ -1,26 +1,31 @@
 """
 Unit tests for template loader
 """
+import json
 import pytest
+from collections.abc import Mapping
 from src.utils.template_loader import TemplateLoader
 
 
-def test_template_loader_initialization():
+@pytest.fixture(scope="module")
+def loader():
+    """Shared TemplateLoader so templates are parsed once per module"""
+    return TemplateLoader()
+
+
+def test_template_loader_initialization(loader):
     """Test TemplateLoader initializes correctly"""
-    loader = TemplateLoader()
     assert loader is not None
     assert isinstance(loader.templates, dict)
 
 
-def test_templates_loaded():
+def test_templates_loaded(loader):
     """Test that templates are loaded"""
-    loader = TemplateLoader()
     assert len(loader.templates) >= 1, "No templates loaded"
 
 
-def test_get_national_id_template():
+def test_get_national_id_template(loader):
     """Test getting National ID template"""
-    loader = TemplateLoader()
     if "kenyan_national_id" in loader.templates:
         template = loader.get_template("kenyan_national_id")
         assert template is not None
@@ -28,35 +33,63 @@ def test_get_national_id_template():
         assert template["document_type"] == "kenyan_national_id"
 
 
-def test_get_security_features():
+def test_get_security_features(loader):
     """Test getting security features"""
-    loader = TemplateLoader()
     if "kenyan_national_id" in loader.templates:
         features = loader.get_security_features("kenyan_national_id")
-        assert isinstance(features, dict)
+        assert isinstance(features, Mapping)
         assert len(features) > 0
         assert "hologram" in features
 
 
-def test_get_data_fields():
+def test_get_data_fields(loader):
     """Test getting data fields"""
-    loader = TemplateLoader()
     if "kenyan_national_id" in loader.templates:
         fields = loader.get_data_fields("kenyan_national_id")
-        assert isinstance(fields, dict)
+        assert isinstance(fields, Mapping)
         assert "id_number" in fields
 
 
-def test_list_supported_documents():
+def test_template_views_are_read_only(tmp_path):
+    """Test that accessors cannot mutate the loaded templates, even nested"""
+    template = {
+        "document_type": "sample_id",
+        "security_features": {"hologram": {"present": True, "priority": "high"}},
+        "data_fields": {"id_number": {"format_regex": "^[0-9]{8}$"}},
+        "forgery_indicators": ["font_mismatch", {"name": "blur"}],
+        "validation_rules": {"min_age": 18},
+    }
+    (tmp_path / "sample_id.json").write_text(json.dumps(template))
+    (tmp_path / "notes.txt").write_text("not a template")
+    sample_loader = TemplateLoader(str(tmp_path))
+
+    assert sample_loader.list_supported_documents() == ["sample_id"]
+    features = sample_loader.get_security_features("sample_id")
+    assert features["hologram"]["present"] is True
+    with pytest.raises(TypeError):
+        features["hologram"] = None
+    with pytest.raises(TypeError):
+        features["hologram"]["present"] = False
+    with pytest.raises(TypeError):
+        sample_loader.get_forgery_indicators("sample_id")[1]["name"] = "noise"
+    assert sample_loader.get_security_features("sample_id") is features
+
+    # get_template hands out a plain, serializable copy
+    copied = sample_loader.get_template("sample_id")
+    assert json.loads(json.dumps(copied)) == template
+    copied["security_features"]["new"] = 1
+    assert "new" not in sample_loader.get_security_features("sample_id")
+    assert sample_loader.templates["sample_id"] == template
+
+
+def test_list_supported_documents(loader):
     """Test listing supported documents"""
-    loader = TemplateLoader()
     docs = loader.list_supported_documents()
     assert isinstance(docs, list)
     assert len(docs) > 0
 
 
-def test_invalid_document_type():
+def test_invalid_document_type(loader):
     """Test error handling for invalid document type"""
-    loader = TemplateLoader()
     with pytest.raises(ValueError):
         loader.get_template("invalid_document")
\ No newline at end of file